@@ -13,15 +13,18 @@ Run with: streamlit run app.py
 import streamlit as st
 import os
 import sys
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.database import init_database, create_conversation, get_user_conversations, get_conversation_messages, add_message, delete_conversation, delete_all_conversations
-from src.auth import register_user, login_user
-from src.rag_chain import create_rag_chain
-from src.embeddings import load_vectorstore
+from src.database import init_database, remove_session, create_conversation, get_user_conversations_with_meta, get_conversation_messages, add_message, add_turn, make_conversation_title, delete_conversation, delete_all_conversations
+from src.auth import register_user, login_user, verify_token, create_restore_code, redeem_restore_code, revoke_restore_code
+from src.rag_chain import create_rag_chain, ask_question_stream
 
 # ============================================
 # PAGE CONFIGURATION
@@ -68,6 +71,27 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# ============================================
+# SHARED RESOURCES
+# ============================================
+@st.cache_resource(show_spinner="Initializing AI...")
+def get_rag_chain():
+    """
+    Build the RAG chain once per process and share it across all sessions.
+    
+    The chain holds the vector store, embedding model and LLM client, none of
+    which can be pickled, so cache_resource (not cache_data) is used.
+    """
+    rag_chain, _ = create_rag_chain()
+    return rag_chain
+
+
+@st.cache_resource
+def get_stream_executor():
+    """Worker threads that run LLM streams, shared across sessions."""
+    return ThreadPoolExecutor(max_workers=8)
+
+
 # ============================================
 # SESSION STATE
 # ============================================
@@ -78,16 +102,66 @@ def init_session_state():
         st.session_state.user_id = None
     if "username" not in st.session_state:
         st.session_state.username = None
+    if "token" not in st.session_state:
+        st.session_state.token = None
+    if "restore_code" not in st.session_state:
+        st.session_state.restore_code = None
     if "current_conversation_id" not in st.session_state:
         st.session_state.current_conversation_id = None
     if "messages" not in st.session_state:
-        st.session_state.messages = []
-    if "rag_chain" not in st.session_state:
-        st.session_state.rag_chain = None
-    if "vectorstore_loaded" not in st.session_state:
-        st.session_state.vectorstore_loaded = False
+        st.session_state.messages = deque()
+    if "oldest_loaded_id" not in st.session_state:
+        st.session_state.oldest_loaded_id = None
+    if "has_older_messages" not in st.session_state:
+        st.session_state.has_older_messages = False
+    if "history_pairs" not in st.session_state:
+        st.session_state.history_pairs = deque(maxlen=HISTORY_TURNS)
+    if "conversations_cache" not in st.session_state:
+        st.session_state.conversations_cache = None
+    if "sidebar_generation" not in st.session_state:
+        st.session_state.sidebar_generation = 0
     if "show_register" not in st.session_state:
         st.session_state.show_register = False
+    
+    # Restore login from the JWT (cheap HMAC check) instead of re-running bcrypt
+    if not st.session_state.logged_in:
+        restore_session_from_token()
+
+
+def remember_login(token):
+    """Put a fresh one-time restore code (not the token) in the URL for page refreshes."""
+    st.session_state.token = token
+    st.session_state.restore_code = create_restore_code(token)
+    st.query_params["session"] = st.session_state.restore_code
+
+
+def forget_login():
+    """Revoke the restore code and remove it from the URL."""
+    if st.session_state.restore_code:
+        revoke_restore_code(st.session_state.restore_code)
+    st.session_state.restore_code = None
+    st.session_state.token = None
+    st.query_params.pop("session", None)
+
+
+def restore_session_from_token():
+    """Log the user back in after a page refresh, via the restore code in the URL."""
+    token = st.session_state.token
+    if not token:
+        code = st.query_params.get("session")
+        token = redeem_restore_code(code) if code else None
+    
+    payload = verify_token(token) if token else None
+    if payload is None:
+        # Unknown, used or expired code, or expired token - drop it
+        forget_login()
+        return
+    
+    st.session_state.logged_in = True
+    st.session_state.user_id = payload["user_id"]
+    st.session_state.username = payload["username"]
+    # The code in the URL was consumed; replace it with a new one
+    remember_login(token)
 
 
 # ============================================
@@ -108,9 +182,9 @@ def show_login_page():
                     st.session_state.logged_in = True
                     st.session_state.user_id = user_id
                     st.session_state.username = username
+                    remember_login(token)
                     # FORCE NEW CHAT ON LOGIN
-                    st.session_state.current_conversation_id = None
-                    st.session_state.messages = []
+                    clear_current_chat()
                     # Don't create chat yet - wait for first message
                     st.rerun()
                 else:
@@ -151,25 +225,231 @@ def show_register_page():
 # ============================================
 # CHAT LOGIC
 # ============================================
+MESSAGE_PAGE_SIZE = 50
+HISTORY_TURNS = 3  # (user, assistant) pairs passed to the RAG chain
+SIDEBAR_CONVERSATION_LIMIT = 50
+
+
+def message_to_dict(m):
+    """Convert a ChatMessage row into the dict stored in session state."""
+    return {
+        "role": m.role,
+        "content": m.content,
+        "timestamp": m.created_at
+    }
+
+
+def clear_current_chat():
+    """Reset session state to an empty "New Chat" draft."""
+    st.session_state.current_conversation_id = None
+    st.session_state.messages = deque()
+    st.session_state.oldest_loaded_id = None
+    st.session_state.has_older_messages = False
+    st.session_state.history_pairs = deque(maxlen=HISTORY_TURNS)
+
+
+STREAM_TIMEOUT_SECONDS = 30
+STREAM_QUEUE_SIZE = 256  # Chunks buffered between the worker and the page
+_STREAM_DONE = object()
+
+
+def stream_in_background(make_stream):
+    """
+    Run the stream from make_stream() on a worker thread and yield its chunks via a queue.
+    
+    The script thread only waits on the queue (with a timeout), so a stalled
+    LLM connection cannot block it indefinitely. When the consumer stops
+    early (timeout, error, Streamlit rerun/stop), the worker is told to stop
+    and closes the LLM stream instead of generating into the void.
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    
+    def put(item):
+        # Wait for room in the queue, but give up once the consumer is gone
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        stream = make_stream()
+        try:
+            for chunk in stream:
+                if not put(chunk):
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            stream.close()  # Ends the HTTP stream to the LLM when stopped early
+            put(_STREAM_DONE)
+    
+    get_stream_executor().submit(produce)
+    
+    try:
+        while True:
+            try:
+                item = chunks.get(timeout=STREAM_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise TimeoutError(f"No response from the model after {STREAM_TIMEOUT_SECONDS}s")
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def append_message(role, content, timestamp=None):
+    """Append a message to the current chat (the store is append-only)."""
+    st.session_state.messages.append({
+        "role": role,
+        "content": content,
+        "timestamp": timestamp or datetime.now()
+    })
+
+
+def prepend_older(page):
+    """Put a page of older ChatMessage rows (oldest first) in front of the chat."""
+    st.session_state.messages.extendleft(message_to_dict(m) for m in reversed(page))
+
+
+def rebuild_history_pairs(messages):
+    """Rebuild the recent (user, assistant) pairs from the tail of a chat."""
+    pairs = deque(maxlen=HISTORY_TURNS)
+    recent = list(messages)[-2 * HISTORY_TURNS:]
+    for i in range(len(recent) - 1):
+        if recent[i]["role"] == "user" and recent[i + 1]["role"] == "assistant":
+            pairs.append((recent[i]["content"], recent[i + 1]["content"]))
+    st.session_state.history_pairs = pairs
+
+
 def load_current_chat():
-    """Load messages for the selected conversation."""
+    """Load the most recent page of messages for the selected conversation."""
+    st.session_state.oldest_loaded_id = None
+    st.session_state.has_older_messages = False
     if st.session_state.current_conversation_id:
-        msgs = get_conversation_messages(st.session_state.current_conversation_id)
-        st.session_state.messages = [{
-            "role": m.role,
-            "content": m.content,
-            "timestamp": m.created_at
-        } for m in msgs]
+        msgs = get_conversation_messages(st.session_state.current_conversation_id, limit=MESSAGE_PAGE_SIZE)
+        st.session_state.messages = deque(message_to_dict(m) for m in msgs)
+        if msgs:
+            st.session_state.oldest_loaded_id = msgs[0].id
+            st.session_state.has_older_messages = len(msgs) == MESSAGE_PAGE_SIZE
+    else:
+        st.session_state.messages = deque()
+    rebuild_history_pairs(st.session_state.messages)
+
+
+def load_older_messages():
+    """Prepend the previous page of messages to the current chat."""
+    msgs = get_conversation_messages(
+        st.session_state.current_conversation_id,
+        limit=MESSAGE_PAGE_SIZE,
+        before_id=st.session_state.oldest_loaded_id
+    )
+    if msgs:
+        prepend_older(msgs)
+        st.session_state.oldest_loaded_id = msgs[0].id
+    st.session_state.has_older_messages = len(msgs) == MESSAGE_PAGE_SIZE
+
+
+@st.fragment
+def render_messages():
+    """
+    Render the loaded messages of the current chat.
+    
+    Runs as a fragment, so "Load older messages" only re-renders this pane
+    instead of the whole page.
+    """
+    if st.session_state.current_conversation_id and st.session_state.has_older_messages:
+        if st.button("⬆️ Load older messages"):
+            load_older_messages()
+    
+    for msg in st.session_state.messages:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+            st.markdown(f"<div class='msg-timestamp'>{msg['timestamp'].strftime('%H:%M')}</div>", unsafe_allow_html=True)
+
+
+# ============================================
+# SIDEBAR
+# ============================================
+def get_cached_conversations():
+    """Sidebar conversation list, only fetched from the DB after invalidation."""
+    if st.session_state.conversations_cache is None:
+        rows = get_user_conversations_with_meta(st.session_state.user_id, limit=SIDEBAR_CONVERSATION_LIMIT)
+        st.session_state.conversations_cache = [{
+            "id": row.id,
+            "title": row.title,
+            "message_count": row.message_count
+        } for row in rows]
+    return st.session_state.conversations_cache
+
+
+def invalidate_conversations_cache():
+    st.session_state.conversations_cache = None
+
+
+def record_turn_in_sidebar(conversation_id, prompt, new_messages=2):
+    """Apply a finished chat turn to the cached sidebar entry (title, count, order)."""
+    cache = get_cached_conversations()
+    entry = next((c for c in cache if c["id"] == conversation_id), None)
+    if entry is None:
+        entry = {"id": conversation_id, "title": "New Chat", "message_count": 0}
     else:
-        st.session_state.messages = []
+        cache.remove(entry)
+    
+    # Mirrors the title add_message derives in the database
+    if entry["title"] == "New Chat":
+        entry["title"] = make_conversation_title(prompt)
+    entry["message_count"] += new_messages
+    
+    # Most recently active first
+    cache.insert(0, entry)
+    del cache[SIDEBAR_CONVERSATION_LIMIT:]
+
+
+def render_conversation_list(placeholder):
+    """Render the cached conversation list into a sidebar placeholder."""
+    # Widget keys carry a generation so the list can be redrawn within one run
+    gen = st.session_state.sidebar_generation
+    conversations = get_cached_conversations()
+    
+    with placeholder.container():
+        if not conversations:
+            st.info("No saved conversations.")
+            return
+        
+        for conv in conversations:
+            # Highlight current chat
+            if conv["id"] == st.session_state.current_conversation_id:
+                label = f"📂 {conv['title']}"
+            else:
+                label = conv["title"]
+            
+            # Create a clickable button for each chat
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                if st.button(label, key=f"conv_{gen}_{conv['id']}", use_container_width=True, help=f"{conv['message_count']} messages"):
+                    st.session_state.current_conversation_id = conv["id"]
+                    load_current_chat()
+                    st.rerun()
+            with col2:
+                if st.button("🗑️", key=f"del_{gen}_{conv['id']}"):
+                    delete_conversation(conv["id"])
+                    invalidate_conversations_cache()
+                    if st.session_state.current_conversation_id == conv["id"]:
+                        clear_current_chat()
+                    st.rerun()
 
 
-def create_new_chat():
-    """Create a new conversation."""
-    conv_id = create_conversation(st.session_state.user_id, "New Chat")
-    st.session_state.current_conversation_id = conv_id
-    st.session_state.messages = []
-    st.rerun()
+def refresh_conversation_list(placeholder):
+    """Redraw the sidebar list in place, without a full script rerun."""
+    st.session_state.sidebar_generation += 1
+    render_conversation_list(placeholder)
 
 
 def show_chat_page():
@@ -178,49 +458,26 @@ def show_chat_page():
         st.title(f"👤 {st.session_state.username}")
         
         if st.button("➕ New Chat", use_container_width=True, type="primary"):
-            st.session_state.current_conversation_id = None
-            st.session_state.messages = []
+            clear_current_chat()
             st.rerun()
         
         st.markdown("### Your Conversations")
         
-        # Get all conversations for user
-        conversations = get_user_conversations(st.session_state.user_id)
-        
-        if not conversations:
-            st.info("No saved conversations.")
-        else:
-            for conv in conversations:
-                # Highlight current chat
-                if conv.id == st.session_state.current_conversation_id:
-                    label = f"📂 {conv.title}"
-                else:
-                    label = conv.title
-                
-                # Create a clickable button for each chat
-                col1, col2 = st.columns([4, 1])
-                with col1:
-                    if st.button(label, key=f"conv_{conv.id}", use_container_width=True):
-                        st.session_state.current_conversation_id = conv.id
-                        load_current_chat()
-                        st.rerun()
-                with col2:
-                    if st.button("🗑️", key=f"del_{conv.id}"):
-                        delete_conversation(conv.id)
-                        if st.session_state.current_conversation_id == conv.id:
-                            st.session_state.current_conversation_id = None
-                            st.session_state.messages = []
-                        st.rerun()
+        # Rendered from the session cache; redrawn in place after a new turn
+        conversation_list = st.empty()
+        render_conversation_list(conversation_list)
         
         st.markdown("---")
         if st.button("🗑️ Clear All History", use_container_width=True, type="secondary"):
             delete_all_conversations(st.session_state.user_id)
-            st.session_state.current_conversation_id = None
-            st.session_state.messages = []
+            invalidate_conversations_cache()
+            clear_current_chat()
             st.rerun()
             
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.logged_in = False
+            forget_login()
+            invalidate_conversations_cache()
             st.rerun()
     
     # --- MAIN CHAT AREA ---
@@ -231,38 +488,26 @@ def show_chat_page():
     if not st.session_state.current_conversation_id:
         pass  # Do nothing, waiting for user input to create chat
 
-    # Load RAG Model
-    if not st.session_state.vectorstore_loaded:
-        with st.spinner("Initializing AI..."):
-            try:
-                st.session_state.rag_chain, _ = create_rag_chain()
-                st.session_state.vectorstore_loaded = True
-            except Exception as e:
-                st.error(f"Error: {e}")
-                st.stop()
+    # Load RAG Model (shared across sessions) before the first question needs it
+    try:
+        get_rag_chain()
+    except Exception as e:
+        st.error(f"Error: {e}")
+        st.stop()
 
     # Display Messages
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
-            st.markdown(f"<div class='msg-timestamp'>{msg['timestamp'].strftime('%H:%M')}</div>", unsafe_allow_html=True)
+    render_messages()
     
     # Input
     if prompt := st.chat_input("Ask a question..."):
         # 1. Add User Message
-        st.session_state.messages.append({
-            "role": "user",
-            "content": prompt,
-            "timestamp": datetime.now()
-        })
+        append_message("user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
         
         # Lazy create chat if it doesn't exist (Draft Mode)
         if not st.session_state.current_conversation_id:
              st.session_state.current_conversation_id = create_conversation(st.session_state.user_id, "New Chat")
-             
-        add_message(st.session_state.current_conversation_id, "user", prompt)
         
         # FEATURE: "Give me all last asked questions" (Local Handler)
         # Check for various natural language triggers
@@ -275,91 +520,82 @@ def show_chat_page():
             "history of my questions"
         ]
         
-        if any(trigger in prompt_lower for trigger in triggers):
-            with st.chat_message("assistant"):
-                # Extract user questions from current session state
-                user_questions = [m["content"] for m in st.session_state.messages if m["role"] == "user"]
+        try:
+            if any(trigger in prompt_lower for trigger in triggers):
+                with st.chat_message("assistant"):
+                    # Extract user questions from current session state
+                    user_questions = [m["content"] for m in st.session_state.messages if m["role"] == "user"]
                 
-                # Exclude the current question itself (last one)
-                user_questions = user_questions[:-1]
+                    # Exclude the current question itself (last one)
+                    user_questions = user_questions[:-1]
                 
-                if user_questions:
-                    response = "**Here are the questions you asked in this chat:**\n\n"
-                    for i, q in enumerate(user_questions, 1):
-                        response += f"{i}. {q}\n"
-                else:
-                    response = "You haven't asked any other questions in this chat yet."
+                    if user_questions:
+                        response = "**Here are the questions you asked in this chat:**\n\n"
+                        for i, q in enumerate(user_questions, 1):
+                            response += f"{i}. {q}\n"
+                    else:
+                        response = "You haven't asked any other questions in this chat yet."
                 
-                st.markdown(response)
+                    st.markdown(response)
+            else:
+                # 2. Get AI Response
+                with st.chat_message("assistant"):
+                    # Recent turns for RAG, maintained incrementally
+                    history = list(st.session_state.history_pairs)
                 
-            # Save to DB and Session
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response,
-                "timestamp": datetime.now()
-            })
-            add_message(st.session_state.current_conversation_id, "assistant", response)
-            
-            # Update Title if needed
-            if len(st.session_state.messages) == 2:
-                new_title = generate_title(prompt)
-                update_conversation_title(st.session_state.current_conversation_id, new_title)
-            
-            st.rerun()
-
-        # 2. Get AI Response
-        with st.chat_message("assistant"):
-            # Prepare history for RAG
-            history = [(m["content"], st.session_state.messages[i+1]["content"]) 
-                      for i, m in enumerate(st.session_state.messages[:-1]) 
-                      if m["role"] == "user" and i+1 < len(st.session_state.messages)]
-            
-            # Create a generator for streaming
-            def stream_response():
-                try:
-                    # Stream the response chunk by chunk
-                    stream = st.session_state.rag_chain.stream({
-                        "question": prompt,
-                        "chat_history": history[-3:] # Pass last 3 turns
-                    })
-                    
-                    full_response = ""
-                    for chunk in stream:
-                        full_response += chunk
-                        yield chunk
+                    # Create a generator for streaming
+                    # (errors propagate, so a failed answer is never saved as a reply)
+                    def stream_response():
+                        # Stream the response chunk by chunk (produced on a worker thread);
+                        # repeated questions are answered from the answer caches
+                        stream = stream_in_background(lambda: ask_question_stream(prompt, history))
                         
-                    # Save complete response to session state after streaming
-                    st.session_state.temp_response = full_response
-                    
-                except Exception as e:
-                    yield f"Error: {e}"
-
-            # Stream output to UI
-            response = st.write_stream(stream_response)
+                        # Collect chunks in a list and join once (avoids O(n^2) string +=)
+                        parts = []
+                        for chunk in stream:
+                            parts.append(chunk)
+                            yield chunk
+                        
+                        # Save complete response to session state after streaming
+                        st.session_state.temp_response = "".join(parts)
+
+                    # Stream output to UI
+                    response = st.write_stream(stream_response)
+        
+        except Exception as e:
+            # Keep the question even if generating the answer failed, but
+            # don't store the error as an answer or feed it into history
+            add_message(st.session_state.current_conversation_id, "user", prompt)
+            record_turn_in_sidebar(st.session_state.current_conversation_id, prompt, new_messages=1)
+            refresh_conversation_list(conversation_list)
+            st.error(f"Error: {e}")
+            return
         
         # 3. Add AI Message (use the response returned by write_stream)
-        st.session_state.messages.append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": datetime.now()
-        })
-        add_message(st.session_state.current_conversation_id, "assistant", response)
+        append_message("assistant", response)
+        # User + assistant rows are written together in one transaction
+        add_turn(st.session_state.current_conversation_id, prompt, response)
+        st.session_state.history_pairs.append((prompt, response))
         
-        # Rerun to update the conversation title in sidebar if it's the first message
-        if len(st.session_state.messages) <= 2:
-            st.rerun()
+        # Update the sidebar title/order in place instead of rerunning the script
+        record_turn_in_sidebar(st.session_state.current_conversation_id, prompt)
+        refresh_conversation_list(conversation_list)
 
 
 def main():
     init_session_state()
     init_database()
     
-    if st.session_state.logged_in:
-        show_chat_page()
-    elif st.session_state.show_register:
-        show_register_page()
-    else:
-        show_login_page()
+    try:
+        if st.session_state.logged_in:
+            show_chat_page()
+        elif st.session_state.show_register:
+            show_register_page()
+        else:
+            show_login_page()
+    finally:
+        # Return this run's DB session to the pool (also runs on st.rerun/st.stop)
+        remove_session()
 
 
 if __name__ == "__main__":
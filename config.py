@@ -30,9 +30,9 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
 
-# ChromaDB Configuration
-CHROMA_PERSIST_DIR = os.path.join(os.path.dirname(__file__), "vectorstore")
-CHROMA_COLLECTION_NAME = "langchain_docs"
+# Vector Store Configuration (saved as <FAISS_INDEX_DIR>/<FAISS_INDEX_NAME>.faiss + .pkl)
+FAISS_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vectorstore")
+FAISS_INDEX_NAME = "langchain_docs"
 
 # Documentation URLs to scrape
 DOC_URLS = {
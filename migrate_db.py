@@ -0,0 +1,60 @@
+"""
+One-off migration: bring an existing database up to the current schema.
+
+Base.metadata.create_all() only creates new tables, so databases created
+before these changes need this script:
+1. Composite indexes for the hot chat/sidebar queries, replacing the ones
+   they make redundant (CONCURRENTLY builds/drops them without locking out writes)
+2. ON DELETE CASCADE on the foreign keys, so deleting a conversation
+   removes its messages inside the database
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from src.database import get_engine
+
+INDEX_STATEMENTS = [
+    # Serves the sidebar (get_user_conversations_with_meta). New name for the
+    # DESC version, so databases that already have the old ascending
+    # ix_conv_user_updated get it too; the old index is then dropped
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conv_user_updated_desc "
+    "ON conversations (user_id, updated_at DESC)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_conv_user_updated",
+    # Messages are paged by id; the (conversation_id, id) index also covers
+    # plain conversation_id lookups, so the other two are only write cost
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_msg_conv_id_desc "
+    "ON chat_messages (conversation_id, id)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_msg_conv_created",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_chat_messages_conversation_id",
+]
+
+# Each statement swaps the constraint atomically
+FOREIGN_KEY_STATEMENTS = [
+    "ALTER TABLE conversations "
+    "DROP CONSTRAINT IF EXISTS conversations_user_id_fkey, "
+    "ADD CONSTRAINT conversations_user_id_fkey "
+    "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+    "ALTER TABLE chat_messages "
+    "DROP CONSTRAINT IF EXISTS chat_messages_conversation_id_fkey, "
+    "ADD CONSTRAINT chat_messages_conversation_id_fkey "
+    "FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE",
+]
+
+
+def migrate_db():
+    # CONCURRENTLY cannot run inside a transaction block
+    engine = get_engine().execution_options(isolation_level="AUTOCOMMIT")
+    
+    with engine.connect() as conn:
+        for statement in INDEX_STATEMENTS + FOREIGN_KEY_STATEMENTS:
+            print(f"Running: {statement}")
+            conn.execute(text(statement))
+    
+    print("Database schema up to date!")
+
+
+if __name__ == "__main__":
+    migrate_db()
@@ -3,8 +3,11 @@ Rebuild Vector Store with Clean Data
 
 This script will:
 1. Delete the old vector store
-2. Reload documentation, filtering out redirect/bad pages
-3. Create new embeddings only for good content
+2. Stream the documentation page by page into new embeddings, only for
+   good content (create_vectorstore drops redirect/bad pages as it ingests)
+
+Pages are split and embedded in batches as they download, so the full
+set of documents and chunks is never held in memory at once.
 """
 import os
 import sys
@@ -12,40 +15,8 @@ import shutil
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.doc_loader import load_all_documentation
-from src.embeddings import VECTORSTORE_DIR, COLLECTION_NAME, get_embeddings
-from langchain_community.vectorstores import Chroma
-
-
-def filter_good_documents(chunks):
-    """Filter out redirect pages and pages with no real content."""
-    good_chunks = []
-    bad_count = 0
-    
-    for chunk in chunks:
-        content = chunk.page_content
-        
-        # Skip redirect pages
-        if 'Redirecting' in content:
-            bad_count += 1
-            continue
-        
-        # Skip very short content
-        if len(content.strip()) < 100:
-            bad_count += 1
-            continue
-        
-        # Skip pages that are mostly navigation
-        if content.count('Skip to') > 2:
-            bad_count += 1
-            continue
-        
-        good_chunks.append(chunk)
-    
-    print(f"Filtered out {bad_count} bad chunks")
-    print(f"Keeping {len(good_chunks)} good chunks")
-    
-    return good_chunks
+from src.doc_loader import iter_chunks
+from src.embeddings import FAISS_INDEX_DIR, create_vectorstore
 
 
 def rebuild_vectorstore():
@@ -56,39 +27,34 @@ def rebuild_vectorstore():
     print("="*60)
     
     # Step 1: Delete old vector store
-    if os.path.exists(VECTORSTORE_DIR):
-        print(f"\n[1/4] Deleting old vector store at: {VECTORSTORE_DIR}")
-        shutil.rmtree(VECTORSTORE_DIR)
+    if os.path.exists(FAISS_INDEX_DIR):
+        print(f"\n[1/2] Deleting old vector store at: {FAISS_INDEX_DIR}")
+        shutil.rmtree(FAISS_INDEX_DIR)
         print("      Done!")
     else:
-        print("\n[1/4] No existing vector store to delete")
+        print("\n[1/2] No existing vector store to delete")
     
-    # Step 2: Load documentation
-    print("\n[2/4] Loading documentation from URLs...")
-    docs, chunks = load_all_documentation()
+    # Step 2: Stream documentation into new embeddings (redirect and bad pages are skipped)
+    print("\n[2/2] Loading documentation and creating embeddings for good documents...")
+    print("      This may take a few minutes...")
     
-    # Step 3: Filter out bad documents
-    print("\n[3/4] Filtering out redirect and bad pages...")
-    good_chunks = filter_good_documents(chunks)
+    chunk_count = 0
     
-    if len(good_chunks) == 0:
-        print("ERROR: No good documents found!")
-        return False
-    
-    # Step 4: Create new embeddings
-    print("\n[4/4] Creating embeddings for good documents...")
-    print(f"      This may take a few minutes for {len(good_chunks)} chunks...")
+    def counted(chunks):
+        nonlocal chunk_count
+        for chunk in chunks:
+            chunk_count += 1
+            yield chunk
     
-    embeddings = get_embeddings()
+    # Vectors are computed in large batches and written straight to FAISS
+    vectorstore = create_vectorstore(counted(iter_chunks()), show_progress=False)
     
-    vectorstore = Chroma.from_documents(
-        documents=good_chunks,
-        embedding=embeddings,
-        persist_directory=VECTORSTORE_DIR,
-        collection_name=COLLECTION_NAME
-    )
+    if vectorstore is None:
+        print("ERROR: No good documents found!")
+        return False
     
-    print(f"\n      Vector store created with {len(good_chunks)} vectors!")
+    print(f"\n      Vector store created with {vectorstore.index.ntotal} vectors "
+          f"({chunk_count - vectorstore.index.ntotal} of {chunk_count} chunks filtered out)!")
     
     # Test the new vector store
     print("\n" + "="*60)
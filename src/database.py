@@ -10,14 +10,13 @@ This allows ChatGPT-style conversation management!
 """
 
 import os
-import sys
+import warnings
+from contextlib import contextmanager
 from datetime import datetime
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Index, case, delete, func, insert, text, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -39,7 +38,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
+    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}')>"
@@ -53,25 +52,36 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(100), default="New Chat")  # Auto-generated from first message
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     user = relationship("User", back_populates="conversations")
-    messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan",
+                            passive_deletes=True, order_by="ChatMessage.id")
     
     def __repr__(self):
         return f"<Conversation(id={self.id}, title='{self.title}')>"
 
 
+# Sidebar: a user's newest conversations, read in index order by the
+# LIMITed subquery in get_user_conversations_with_meta
+Index("ix_conv_user_updated_desc", Conversation.user_id, Conversation.updated_at.desc())
+
+
 class ChatMessage(Base):
     """Individual message within a conversation."""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Paging the newest messages of a chat (keyset on id); also serves
+        # every other lookup by conversation_id, so that column has no index of its own
+        Index("ix_msg_conv_id_desc", "conversation_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(10), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -96,14 +106,59 @@ def get_database_url():
     return f"postgresql://{user}:{password}@{host}:{port}/{db}"
 
 
+# Built once at import so every helper reuses the same connection pool
+# (create_engine does not connect until the first query).
+engine = create_engine(
+    get_database_url(),
+    echo=False,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,   # Transparently replace connections dropped by the server
+    pool_recycle=1800,
+)
+
+# One session per thread (Streamlit runs each script run on its own thread)
+SessionLocal = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+# Opt-in (DB_ASYNC_COMMIT=true): chat message writes commit without waiting
+# for the WAL flush. A crash can then lose the last few hundred ms of
+# acknowledged messages (never corrupts data). Off by default: fully durable.
+ASYNC_MESSAGE_COMMIT = os.getenv("DB_ASYNC_COMMIT", "false").lower() in ("1", "true", "yes")
+
+
 def get_engine():
-    return create_engine(get_database_url(), echo=False)
+    return engine
 
 
 def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return SessionLocal()
+
+
+def remove_session():
+    """Release the current thread's session. Call at the end of each script run."""
+    SessionLocal.remove()
+
+
+@contextmanager
+def session_scope(async_commit: bool = False):
+    """
+    Provide a transactional scope around a series of operations.
+    
+    Commits on success, rolls back and re-raises on error, always closes.
+    With async_commit, the commit returns before PostgreSQL flushes the WAL
+    to disk (SET LOCAL synchronous_commit = off, this transaction only).
+    """
+    session = get_session()
+    try:
+        if async_commit:
+            session.execute(text("SET LOCAL synchronous_commit = off"))
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 
 def init_database():
@@ -123,136 +178,175 @@ def init_database():
 
 def create_conversation(user_id: int, title: str = "New Chat") -> int:
     """Create a new conversation and return its ID."""
-    session = get_session()
-    try:
+    with session_scope() as session:
         conv = Conversation(user_id=user_id, title=title)
         session.add(conv)
-        session.commit()
+        session.flush()
         return conv.id
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
 
 
-def get_user_conversations(user_id: int, limit: int = 20):
-    """Get all conversations for a user, most recent first."""
+def get_user_conversations_with_meta(user_id: int, limit: int = 50):
+    """
+    Get a user's conversations together with sidebar metadata in one query.
+    
+    Adding a message bumps its conversation's updated_at (touch_conversation),
+    so the newest `limit` conversations are picked straight off the
+    (user_id, updated_at DESC) index first; only those are joined to their
+    messages for the counts.
+    
+    Returns:
+        List of named tuples (id, title, updated_at, message_count,
+        last_message_at), most recently active first
+    """
     session = get_session()
     try:
-        conversations = session.query(Conversation)\
+        recent = session.query(Conversation.id, Conversation.title, Conversation.updated_at)\
             .filter(Conversation.user_id == user_id)\
             .order_by(Conversation.updated_at.desc())\
             .limit(limit)\
+            .subquery()
+        
+        message_count = func.count(ChatMessage.id).label("message_count")
+        last_message_at = func.max(ChatMessage.created_at).label("last_message_at")
+        rows = session.query(recent.c.id, recent.c.title, recent.c.updated_at,
+                             message_count, last_message_at)\
+            .outerjoin(ChatMessage, ChatMessage.conversation_id == recent.c.id)\
+            .group_by(recent.c.id, recent.c.title, recent.c.updated_at)\
+            .order_by(recent.c.updated_at.desc())\
             .all()
-        return conversations
+        return rows
     finally:
         session.close()
 
 
-def get_conversation_messages(conversation_id: int):
-    """Get all messages for a conversation."""
+def get_conversation_messages(conversation_id: int, limit: int = 50, before_id: int = None):
+    """
+    Get a page of messages for a conversation, oldest first.
+    
+    Uses keyset pagination on the message id: the newest `limit` messages
+    are fetched, or the newest `limit` messages older than `before_id`.
+    Pass limit=None to fetch the whole conversation.
+    """
     session = get_session()
     try:
-        messages = session.query(ChatMessage)\
-            .filter(ChatMessage.conversation_id == conversation_id)\
-            .order_by(ChatMessage.created_at.asc())\
-            .all()
+        query = session.query(ChatMessage)\
+            .filter(ChatMessage.conversation_id == conversation_id)
+        if before_id is not None:
+            query = query.filter(ChatMessage.id < before_id)
+        query = query.order_by(ChatMessage.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        messages = query.all()
+        # Newest-first from the DB, reversed for display
+        messages.reverse()
         return messages
     finally:
         session.close()
 
 
+def make_conversation_title(content: str) -> str:
+    """Derive a conversation title from its first user message (first 50 chars)."""
+    return content[:50] + "..." if len(content) > 50 else content
+
+
+def touch_conversation(session, conversation_id: int, first_user_message: str = None):
+    """
+    Bump a conversation's updated_at, and title it from the first user message.
+    
+    A single UPDATE: the "still titled New Chat?" check happens in SQL,
+    so the conversation row never has to be SELECTed first.
+    """
+    values = {"updated_at": datetime.utcnow()}
+    if first_user_message is not None:
+        values["title"] = case(
+            (Conversation.title == "New Chat", make_conversation_title(first_user_message)),
+            else_=Conversation.title
+        )
+    session.execute(
+        update(Conversation).where(Conversation.id == conversation_id).values(**values)
+    )
+
+
 def add_message(conversation_id: int, role: str, content: str) -> int:
     """Add a message to a conversation."""
-    session = get_session()
-    try:
+    with session_scope(async_commit=ASYNC_MESSAGE_COMMIT) as session:
         msg = ChatMessage(conversation_id=conversation_id, role=role, content=content)
         session.add(msg)
+        session.flush()
         
-        # Update conversation title if it's the first user message
-        conv = session.query(Conversation).filter(Conversation.id == conversation_id).first()
-        if conv and conv.title == "New Chat" and role == "user":
-            # Set title to first 50 chars of first message
-            conv.title = content[:50] + "..." if len(content) > 50 else content
-        
-        # Update conversation timestamp
-        conv.updated_at = datetime.utcnow()
-        
-        session.commit()
+        # Update timestamp (and title if it's the first user message)
+        touch_conversation(session, conversation_id, content if role == "user" else None)
         return msg.id
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
 
 
-def delete_conversation(conversation_id: int):
-    """Delete a conversation and all its messages."""
-    session = get_session()
-    try:
-        # Custom delete to handle foreign keys if cascade doesn't work
-        # First delete all messages in this conversation
-        session.query(ChatMessage)\
-            .filter(ChatMessage.conversation_id == conversation_id)\
-            .delete(synchronize_session=False)
-            
-        # Then delete the conversation
-        session.query(Conversation)\
-            .filter(Conversation.id == conversation_id)\
-            .delete(synchronize_session=False)
-            
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+def add_turn(conversation_id: int, user_content: str, assistant_content: str):
+    """
+    Save a user message and its assistant reply in a single transaction.
+    
+    One commit (and one conversation update) per turn instead of two.
+    """
+    with session_scope(async_commit=ASYNC_MESSAGE_COMMIT) as session:
+        session.add_all([
+            ChatMessage(conversation_id=conversation_id, role="user", content=user_content),
+            ChatMessage(conversation_id=conversation_id, role="assistant", content=assistant_content),
+        ])
+        session.flush()
+        
+        touch_conversation(session, conversation_id, user_content)
 
 
-def delete_all_conversations(user_id: int):
-    """Delete all conversations for a user."""
-    session = get_session()
-    try:
-        # First get all conversation IDs for this user
-        conv_ids = session.query(Conversation.id).filter(Conversation.user_id == user_id).all()
-        conv_ids = [c[0] for c in conv_ids]
-        
-        if conv_ids:
-            # Delete all messages for these conversations
-            session.query(ChatMessage)\
-                .filter(ChatMessage.conversation_id.in_(conv_ids))\
-                .delete(synchronize_session=False)
-        
-        # Then delete the conversations
-        session.query(Conversation)\
-            .filter(Conversation.user_id == user_id)\
-            .delete(synchronize_session=False)
-            
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+def add_messages_bulk(conversation_id: int, rows: list):
+    """
+    Insert many (role, content) messages into a conversation at once.
+    
+    For importing transcripts or replaying logs: one executemany INSERT
+    (no per-row ORM bookkeeping) plus one conversation update.
+    """
+    if not rows:
+        return 0
+    
+    first_user_message = next((content for role, content in rows if role == "user"), None)
+    with session_scope(async_commit=ASYNC_MESSAGE_COMMIT) as session:
+        now = datetime.utcnow()
+        session.execute(
+            insert(ChatMessage),
+            [
+                {"conversation_id": conversation_id, "role": role, "content": content, "created_at": now}
+                for role, content in rows
+            ]
+        )
+        touch_conversation(session, conversation_id, first_user_message)
+    return len(rows)
 
 
-# Legacy functions for backward compatibility
-def add_chat_message(user_id: int, role: str, message: str):
-    """Legacy function - now requires conversation_id in app.py"""
-    pass  # Will be handled in app.py
+def delete_conversation(conversation_id: int):
+    """Delete a conversation and all its messages."""
+    with session_scope() as session:
+        # Messages are removed by the database (ON DELETE CASCADE)
+        session.execute(
+            delete(Conversation).where(Conversation.id == conversation_id)
+        )
+    return True
 
 
-def get_user_chat_history(user_id: int, limit: int = 50):
-    """Legacy function - now use get_conversation_messages"""
-    return []
+def delete_all_conversations(user_id: int):
+    """Delete all conversations for a user."""
+    with session_scope() as session:
+        # One bulk DELETE; messages are removed by ON DELETE CASCADE
+        session.execute(
+            delete(Conversation).where(Conversation.user_id == user_id),
+            execution_options={"synchronize_session": False}
+        )
+    return True
 
 
 def clear_user_chat_history(user_id: int):
-    """Legacy - now use delete_all_conversations"""
+    """Legacy - now use delete_all_conversations (will be removed)."""
+    warnings.warn(
+        "clear_user_chat_history is deprecated; use delete_all_conversations",
+        DeprecationWarning,
+        stacklevel=2
+    )
     return delete_all_conversations(user_id)
 
 
@@ -14,8 +14,31 @@ Why we use WebBaseLoader:
 
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+import hashlib
 import os
+import pickle
+import time
+import requests
+
+# Pages are fetched concurrently; each fetch is dominated by network latency
+MAX_FETCH_WORKERS = 16
+
+# Loaded pages are cached on disk so reruns skip the network.
+# After the TTL a cached page is revalidated with a conditional request.
+DOC_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".doc_cache")
+DOC_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Chunks are measured in tokens of the embedding model's own tokenizer.
+# all-MiniLM-L6-v2 truncates input at 256 tokens, [CLS] and [SEP] included,
+# while the splitter counts content tokens only: 2 are left for those, or
+# every full-size chunk would silently lose its tail during embedding.
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_MAX_TOKENS = 256
+CHUNK_SIZE_TOKENS = EMBED_MAX_TOKENS - 2
+CHUNK_OVERLAP_TOKENS = 32
 
 
 # Documentation URLs for each framework
@@ -128,45 +151,178 @@ LANGSMITH_URLS = [
 ]
 
 
-def load_documents_from_urls(urls: List[str], source_name: str) -> List:
+def _cache_path(url: str) -> str:
+    return os.path.join(DOC_CACHE_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".pkl")
+
+
+def _write_cache(path: str, entry: dict):
+    os.makedirs(DOC_CACHE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(entry, f)
+    os.replace(tmp_path, path)  # Atomic, so a crash never leaves a torn file
+
+
+def _fetch_page(url: str) -> Tuple[List, dict]:
     """
-    Load documents from a list of URLs.
+    Load a page with WebBaseLoader, keeping the ETag / Last-Modified headers.
+    
+    The validators (used for later conditional requests) are read from the
+    loader's own GET response, so no extra request is needed.
+    """
+    loader = WebBaseLoader(url)
+    responses = []
+    loader.session.hooks["response"].append(lambda response, *args, **kwargs: responses.append(response))
+    
+    docs = loader.load()
+    
+    headers = responses[-1].headers if responses else {}
+    return docs, {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def _is_unchanged(url: str, entry: dict) -> bool:
+    """Ask the server whether the page changed since it was cached (HTTP 304)."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    if not headers:
+        return False
+    
+    try:
+        response = requests.head(url, headers=headers, timeout=10, allow_redirects=True)
+        return response.status_code == 304
+    except requests.RequestException:
+        return False
+
+
+def load_url(url: str, use_cache: bool = True) -> List:
+    """
+    Fetch and parse a single documentation page, using the disk cache.
     
     Args:
-        urls: List of documentation URLs to load
-        source_name: Name of the source (e.g., 'langchain', 'langgraph')
+        url: Page to load
+        use_cache: Set to False to always refetch from the network
     
     Returns:
-        List of loaded documents with metadata
+        List of loaded documents
     """
-    print(f"\nLoading {source_name} documentation...")
-    print(f"   URLs to load: {len(urls)}")
+    path = _cache_path(url)
+    
+    if use_cache and os.path.exists(path):
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+        
+        age = time.time() - entry["fetched_at"]
+        if age < DOC_CACHE_TTL_SECONDS:
+            return entry["docs"]
+        if _is_unchanged(url, entry):
+            entry["fetched_at"] = time.time()
+            _write_cache(path, entry)
+            return entry["docs"]
+    
+    docs, validators = _fetch_page(url)
+    _write_cache(path, {"docs": docs, "fetched_at": time.time(), **validators})
+    return docs
+
+
+def iter_url_documents(urls: List[str], source_name: str,
+                       use_cache: bool = True) -> Iterator[Tuple[str, List]]:
+    """
+    Yield (url, documents) for each URL as soon as that page is loaded.
     
-    all_docs = []
+    Pages are fetched in parallel on a thread pool; a failing URL is
+    reported and skipped without affecting the others.
     
-    for i, url in enumerate(urls, 1):
-        try:
-            print(f"   [{i}/{len(urls)}] Loading: {url[:50]}...")
-            loader = WebBaseLoader(url)
-            docs = loader.load()
+    Args:
+        urls: List of documentation URLs to load
+        source_name: Name of the source (e.g., 'langchain', 'langgraph')
+        use_cache: Set to False to always refetch from the network
+    """
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = [executor.submit(load_url, url, use_cache) for url in urls]
+        
+        # Yield in URL order so the output is deterministic
+        for i, (url, future) in enumerate(zip(urls, futures), 1):
+            error = future.exception()
+            if error is not None:
+                print(f"   [{i}/{len(urls)}] Error loading {url}: {error}")
+                continue
+            
+            docs = future.result()
             
             # Add source metadata to each document
             for doc in docs:
                 doc.metadata["source_framework"] = source_name
                 doc.metadata["source_url"] = url
             
-            all_docs.extend(docs)
-            all_docs.extend(docs)
-            print(f"         Loaded {len(docs)} document(s)")
-            
-        except Exception as e:
-            print(f"         Error loading {url}: {e}")
+            print(f"   [{i}/{len(urls)}] Loaded {len(docs)} document(s) from {url[:50]}...")
+            yield url, docs
+
+
+def load_documents_from_urls(urls: List[str], source_name: str, use_cache: bool = True) -> List:
+    """
+    Load documents from a list of URLs.
+    
+    Args:
+        urls: List of documentation URLs to load
+        source_name: Name of the source (e.g., 'langchain', 'langgraph')
+        use_cache: Set to False to always refetch from the network
+    
+    Returns:
+        List of loaded documents with metadata
+    """
+    print(f"\nLoading {source_name} documentation...")
+    print(f"   URLs to load: {len(urls)}")
+    
+    all_docs = []
+    for url, docs in iter_url_documents(urls, source_name, use_cache):
+        all_docs.extend(docs)
     
     print(f"   Total {source_name} documents loaded: {len(all_docs)}")
     return all_docs
 
 
-def split_documents(documents: List, chunk_size: int = 1000, chunk_overlap: int = 200) -> List:
+@lru_cache(maxsize=None)
+def get_text_splitter(chunk_size: int = CHUNK_SIZE_TOKENS,
+                      chunk_overlap: int = CHUNK_OVERLAP_TOKENS) -> RecursiveCharacterTextSplitter:
+    """
+    Build the token-aware text splitter once per configuration and reuse it.
+    
+    Token counting uses the HuggingFace `tokenizers` (Rust) backend.
+    """
+    from transformers import AutoTokenizer
+    
+    tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    return RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+        tokenizer,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", " ", ""]  # Split by paragraphs first, then lines, etc.
+    )
+
+
+def number_chunks(chunks: List) -> List:
+    """
+    Store each chunk's position within its source page as metadata["chunk_index"].
+    
+    Together with source_url this gives every chunk a stable identity, used
+    for deterministic vector store IDs.
+    """
+    counters = {}
+    for chunk in chunks:
+        url = chunk.metadata.get("source_url", "")
+        chunk.metadata["chunk_index"] = counters.get(url, 0)
+        counters[url] = chunk.metadata["chunk_index"] + 1
+    return chunks
+
+
+def split_documents(documents: List, chunk_size: int = CHUNK_SIZE_TOKENS,
+                    chunk_overlap: int = CHUNK_OVERLAP_TOKENS) -> List:
     """
     Split documents into smaller chunks for embedding.
     
@@ -175,37 +331,37 @@ def split_documents(documents: List, chunk_size: int = 1000, chunk_overlap: int
     - Smaller chunks = more precise retrieval
     - Overlap ensures we don't lose context at chunk boundaries
     
+    Why tokens instead of characters:
+    - The embedding model only sees its first 256 tokens
+    - Token-sized chunks are uniform, so none are truncated or wasted
+    
     Args:
         documents: List of documents to split
-        chunk_size: Maximum characters per chunk (default: 1000)
-        chunk_overlap: Characters to overlap between chunks (default: 200)
+        chunk_size: Maximum tokens per chunk (default: 256)
+        chunk_overlap: Tokens to overlap between chunks (default: 32)
     
     Returns:
         List of document chunks
     """
     print(f"\nSplitting {len(documents)} documents into chunks...")
-    print(f"   Chunk size: {chunk_size} characters")
-    print(f"   Chunk overlap: {chunk_overlap} characters")
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]  # Split by paragraphs first, then lines, etc.
-    )
+    print(f"   Chunk size: {chunk_size} tokens")
+    print(f"   Chunk overlap: {chunk_overlap} tokens")
     
-    chunks = text_splitter.split_documents(documents)
+    text_splitter = get_text_splitter(chunk_size, chunk_overlap)
     
-    chunks = text_splitter.split_documents(documents)
+    chunks = number_chunks(text_splitter.split_documents(documents))
     
     print(f"   Created {len(chunks)} chunks from {len(documents)} documents")
     return chunks
 
 
-def load_all_documentation():
+def load_all_documentation(use_cache: bool = True):
     """
     Load documentation from all three frameworks.
     
+    Args:
+        use_cache: Set to False to ignore the disk cache and refetch every page
+    
     Returns:
         Tuple of (all_documents, all_chunks)
     """
@@ -216,15 +372,15 @@ def load_all_documentation():
     all_docs = []
     
     # Load LangChain docs
-    langchain_docs = load_documents_from_urls(LANGCHAIN_URLS, "langchain")
+    langchain_docs = load_documents_from_urls(LANGCHAIN_URLS, "langchain", use_cache)
     all_docs.extend(langchain_docs)
     
     # Load LangGraph docs
-    langgraph_docs = load_documents_from_urls(LANGGRAPH_URLS, "langgraph")
+    langgraph_docs = load_documents_from_urls(LANGGRAPH_URLS, "langgraph", use_cache)
     all_docs.extend(langgraph_docs)
     
     # Load LangSmith docs
-    langsmith_docs = load_documents_from_urls(LANGSMITH_URLS, "langsmith")
+    langsmith_docs = load_documents_from_urls(LANGSMITH_URLS, "langsmith", use_cache)
     all_docs.extend(langsmith_docs)
     
     print("\n" + "="*60)
@@ -242,6 +398,29 @@ def load_all_documentation():
     return all_docs, chunks
 
 
+def iter_chunks(use_cache: bool = True) -> Iterator:
+    """
+    Yield document chunks from all three frameworks, URL by URL.
+    
+    Each page is split as soon as it is loaded, so a consumer (like
+    create_vectorstore) can embed early chunks while later pages are still
+    downloading, and only one page's chunks are held in memory at a time.
+    
+    Args:
+        use_cache: Set to False to ignore the disk cache and refetch every page
+    """
+    text_splitter = get_text_splitter()
+    
+    for urls, source_name in [
+        (LANGCHAIN_URLS, "langchain"),
+        (LANGGRAPH_URLS, "langgraph"),
+        (LANGSMITH_URLS, "langsmith"),
+    ]:
+        print(f"\nStreaming {source_name} documentation ({len(urls)} URLs)...")
+        for url, docs in iter_url_documents(urls, source_name, use_cache):
+            yield from number_chunks(text_splitter.split_documents(docs))
+
+
 # This allows the file to be run directly for testing
 if __name__ == "__main__":
     docs, chunks = load_all_documentation()
@@ -2,138 +2,633 @@
 Embeddings and Vector Store Module
 
 This module handles:
-1. Creating embeddings using Ollama's nomic-embed-text model
-2. Storing documents in ChromaDB (persistent vector database)
+1. Creating embeddings using HuggingFace's all-MiniLM-L6-v2 model (GPU when available)
+2. Storing documents in a FAISS index (saved to disk)
 3. Loading existing vector store for queries
 
-Why ChromaDB?
+Why FAISS?
 - Easy to set up (no external server needed)
 - Persists to disk (data survives restarts)
-- Great for learning and prototyping
+- Search runs in C++ with SIMD distance kernels
 - Works seamlessly with LangChain
 
-Why nomic-embed-text?
-- Free, runs locally via Ollama
-- Good quality embeddings (768 dimensions)
-- Fast inference
+Why all-MiniLM-L6-v2?
+- Free, runs locally via sentence-transformers
+- Good quality embeddings (384 dimensions)
+- Fast inference (fp16 on CUDA, int8 ONNX Runtime on CPU)
+
+Build or test the store from the project root with: python -m src.embeddings
 """
 
+import hashlib
 import os
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from typing import List, Optional
+import pickle
+import platform
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from typing import Iterable, List, Optional
+
+from config import FAISS_INDEX_DIR, FAISS_INDEX_NAME
+
+# Vector store location is set in config.py (<FAISS_INDEX_NAME>.faiss + .pkl), plus
+# the exact float32 vectors in .npy so re-ingestion never works from int8 codes
+VECTORS_PATH = os.path.join(FAISS_INDEX_DIR, f"{FAISS_INDEX_NAME}.npy")
+
+# Texts per embed_documents call (larger on GPU)
+EMBED_BATCH_SIZE = 128
+GPU_EMBED_BATCH_SIZE = 256
+
+# CPU embedding backend: "auto" (ONNX Runtime when available, else PyTorch),
+# "onnx" (never imports torch, so CPU-only installs can skip it) or "torch"
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "auto").lower()
+EMBED_MODEL_REPO = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_MAX_TOKENS = 256  # MiniLM's max_seq_length in sentence-transformers
+
+# Pre-quantized int8 exports published in the model repo's onnx/ folder
+ONNX_MODEL_FILE = os.getenv(
+    "ONNX_MODEL_FILE",
+    "onnx/model_qint8_arm64.onnx" if platform.machine().lower() in ("arm64", "aarch64")
+    else "onnx/model_quint8_avx2.onnx"
+)
+
+# Chunks embedded + written per step when building the store from a stream
+INGEST_BATCH_SIZE = 512
+
+# HNSW graph index: neighbours per node, build-time and query-time beam width.
+# Raise HNSW_EF_SEARCH for better recall, lower it for faster queries.
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Vectors the int8 ranges are learned from (a random sample on larger stores)
+SQ_TRAIN_SAMPLE = 100_000
+
+# mmap flag for flat-code storage (HNSW's vectors); older FAISS only has IO_FLAG_MMAP
+FAISS_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
 
-# Get the directory where this file is located
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-PARENT_DIR = os.path.dirname(CURRENT_DIR)
+# Store opened by load_vectorstore, reused for the life of the process
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
 
-# Vector store will be saved here
-VECTORSTORE_DIR = os.path.join(PARENT_DIR, "vectorstore")
-COLLECTION_NAME = "langchain_docs"
+
+def get_device() -> str:
+    """Pick the fastest available torch device: CUDA, then Apple MPS, then CPU."""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"  # No torch installed: only the ONNX backend can run
+    
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
 
 
+class OnnxEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime with int8 weights, for CPU-only deployments.
+    
+    Same output as sentence-transformers (mean pooling + L2 norm), but the
+    quantized graph runs on ONNX Runtime's int8 CPU kernels instead of PyTorch.
+    """
+    
+    def __init__(self, model_file: str = ONNX_MODEL_FILE, batch_size: int = EMBED_BATCH_SIZE,
+                 local_files_only: bool = True):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(EMBED_MODEL_REPO, local_files_only=local_files_only)
+        model_path = hf_hub_download(EMBED_MODEL_REPO, model_file, local_files_only=local_files_only)
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.encode_kwargs = {'batch_size': batch_size}
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a float32 array of unit-length rows."""
+        batch_size = self.encode_kwargs['batch_size']
+        parts = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=EMBED_MAX_TOKENS, return_tensors="np"
+            )
+            feed = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]  # (batch, tokens, dim)
+            
+            # Mean over real tokens only, then normalize (like normalize_embeddings=True)
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            parts.append(pooled.astype(np.float32))
+        
+        if not parts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(parts)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def get_onnx_embeddings() -> Optional[OnnxEmbeddings]:
+    """
+    Load the ONNX embeddings model.
+    
+    Returns None (so the caller falls back to PyTorch) if ONNX Runtime is
+    not installed or the model can't be loaded or downloaded. With
+    EMBED_BACKEND=onnx there is no fallback, and these failures raise.
+    """
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        if EMBED_BACKEND == "onnx":
+            raise ImportError("EMBED_BACKEND=onnx requires onnxruntime (pip install onnxruntime)") from e
+        return None
+    
+    try:
+        try:
+            # Try loading locally first (same as the PyTorch model below)
+            return OnnxEmbeddings(local_files_only=True)
+        except Exception:
+            print("Local ONNX model not found. Downloading from HuggingFace...")
+            return OnnxEmbeddings(local_files_only=False)
+    except Exception as e:
+        if EMBED_BACKEND == "onnx":
+            raise RuntimeError(f"Could not load the ONNX embeddings model: {e}") from e
+        print(f"ONNX model unavailable ({e}), falling back to PyTorch embeddings")
+        return None
+
+
+@lru_cache(maxsize=1)
 def get_embeddings():
     """
-    Get the HuggingFace embeddings model (runs locally on CPU).
+    Get the embeddings model for all-MiniLM-L6-v2 (runs locally, on GPU when available).
+    
+    The model is loaded once per process; later calls return the same object.
+    On CUDA the model runs in fp16, which roughly halves memory traffic
+    for the matmul-heavy MiniLM forward pass. On CPU the int8 ONNX export
+    is used when ONNX Runtime is installed (set EMBED_BACKEND=torch to opt out);
+    torch is only imported when the PyTorch model is actually used.
+    
+    Switching backends changes the vectors slightly, so rebuild the
+    vector store (rebuild_vectorstore.py) after changing EMBED_BACKEND.
     
     Returns:
-        HuggingFaceEmbeddings configured with all-MiniLM-L6-v2
+        HuggingFaceEmbeddings or OnnxEmbeddings configured with all-MiniLM-L6-v2
     """
+    device = "cpu" if EMBED_BACKEND == "onnx" else get_device()
+    if device == "cpu" and EMBED_BACKEND != "torch":
+        onnx_embeddings = get_onnx_embeddings()
+        if onnx_embeddings is not None:
+            return onnx_embeddings
+    
+    # PyTorch path (sentence-transformers)
+    from langchain_huggingface import HuggingFaceEmbeddings
+    
+    model_kwargs = {'device': device}
+    if device == "cuda":
+        import torch
+        model_kwargs['model_kwargs'] = {'torch_dtype': torch.float16}
+    
+    encode_kwargs = {
+        'normalize_embeddings': True,
+        'batch_size': EMBED_BATCH_SIZE if device == "cpu" else GPU_EMBED_BATCH_SIZE,
+        'convert_to_numpy': True,
+    }
+    
     try:
         # Try loading locally first (Faster & fixes SSL errors if cached)
         return HuggingFaceEmbeddings(
             model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu', 'local_files_only': True},
-            encode_kwargs={'normalize_embeddings': True}
+            model_kwargs={**model_kwargs, 'local_files_only': True},
+            encode_kwargs=encode_kwargs
         )
     except Exception:
         # Fallback to downloading (For new users/fresh clones)
         print("Local model not found. Downloading from HuggingFace...")
         return HuggingFaceEmbeddings(
             model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu', 'local_files_only': False},
-            encode_kwargs={'normalize_embeddings': True}
+            model_kwargs={**model_kwargs, 'local_files_only': False},
+            encode_kwargs=encode_kwargs
         )
 
 
-def create_vectorstore(documents: List, show_progress: bool = True) -> Chroma:
+def embed_texts(texts: List[str], embeddings=None, batch_size: Optional[int] = None,
+                show_progress: bool = True) -> np.ndarray:
+    """
+    Embed texts in fixed-size batches.
+    
+    Large batches amortize the per-call model overhead, and computing the
+    vectors up front lets them be written to the index without a second embed.
+    Vectors are packed into one float32 array (4 bytes per value) instead of
+    lists of Python floats (~32 bytes per value), the format FAISS takes in.
+    
+    Args:
+        texts: Texts to embed
+        embeddings: Embeddings model (loaded if not provided)
+        batch_size: Number of texts per model call (defaults to the model's encode batch size)
+        show_progress: Whether to show progress messages
+    
+    Returns:
+        Array of shape (len(texts), dim), one unit-length row per input text
+    """
+    embeddings = embeddings or get_embeddings()
+    batch_size = batch_size or embeddings.encode_kwargs.get('batch_size', EMBED_BATCH_SIZE)
+    # OnnxEmbeddings returns arrays directly, skipping the list-of-floats round trip
+    embed_batch = embeddings.encode if isinstance(embeddings, OnnxEmbeddings) else embeddings.embed_documents
+    vectors = None
+    
+    for start in range(0, len(texts), batch_size):
+        batch = np.asarray(embed_batch(texts[start:start + batch_size]), dtype=np.float32)
+        if vectors is None:
+            vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+        vectors[start:start + len(batch)] = batch
+        if show_progress:
+            print(f"   Embedded {min(start + batch_size, len(texts))}/{len(texts)} chunks")
+    
+    if vectors is None:
+        return np.empty((0, 0), dtype=np.float32)
+    
+    # Unit length, so the inner-product index scores are cosine similarities
+    # (the model already normalizes; this makes it a guarantee)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def chunk_id(doc) -> str:
+    """
+    Deterministic ID for a chunk: hash of its source URL and position.
+    
+    Re-ingesting the same page produces the same IDs, so writes are upserts
+    instead of duplicate vectors. Chunks without that metadata fall back to
+    a hash of their content.
+    """
+    if "source_url" in doc.metadata and "chunk_index" in doc.metadata:
+        key = f"{doc.metadata['source_url']}|{doc.metadata['chunk_index']}"
+    else:
+        key = doc.page_content
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Lines that are site navigation, not documentation
+_NAV_LINE_RE = re.compile(r'^\s*(?:Docs|Search|Home|API Reference|Tutorials)\s*$', re.MULTILINE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def clean_content(text: str) -> str:
+    """Strip navigation lines and join the rest into one line of prompt text."""
+    # Two C-level regex passes instead of a Python loop over every line
+    return _WHITESPACE_RE.sub(' ', _NAV_LINE_RE.sub('', text)).strip()
+
+
+def prepare_chunk(doc):
+    """
+    Drop chunks that would never be useful as context; clean the rest.
+    
+    Filtering here (instead of after every retrieval) keeps redirect and
+    navigation pages out of the index, so every retrieved slot is usable.
+    The cleaned text is stored in metadata["clean_content"] for the prompt.
+    
+    Returns:
+        The document, or None if it should not be indexed
+    """
+    content = doc.page_content
+    if 'Redirecting' in content:
+        return None
+    if len(content.strip()) < 100:  # Very short content
+        return None
+    if 'Skip to main content' in content and len(content) < 200:
+        return None
+    if content.count('Skip to') > 2:  # Mostly navigation
+        return None
+    
+    cleaned = clean_content(content)
+    if len(cleaned) <= 50:
+        return None
+    
+    doc.metadata["clean_content"] = cleaned
+    return doc
+
+
+def vectorstore_exists() -> bool:
+    """Check whether a saved FAISS index is on disk."""
+    return os.path.exists(os.path.join(FAISS_INDEX_DIR, f"{FAISS_INDEX_NAME}.faiss"))
+
+
+def vectorstore_version() -> Optional[str]:
+    """Identify the saved index (changes on every rebuild), or None if there is none."""
+    path = os.path.join(FAISS_INDEX_DIR, f"{FAISS_INDEX_NAME}.faiss")
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def new_index(training_vectors: np.ndarray):
+    """
+    Create an empty HNSW index with int8 vector storage.
+    
+    HNSW walks a neighbour graph instead of scanning every vector, so a
+    query costs roughly O(log N) distance computations rather than O(N).
+    Each vector is stored as one byte per dimension (4x smaller than
+    float32), scaled by a per-dimension min/max learned from
+    `training_vectors`. Vectors are unit length, so inner product is the
+    cosine similarity with no per-query norm computations.
+    """
+    index = faiss.IndexHNSWSQ(
+        training_vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(training_vectors)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def set_ef_search(vectorstore: FAISS, ef_search: int):
+    """Set how many graph candidates each query explores (recall vs latency)."""
+    faiss.ParameterSpace().set_index_parameter(vectorstore.index, "efSearch", ef_search)
+
+
+def new_vectorstore(embeddings, index) -> FAISS:
+    """Wrap an empty FAISS index in a vector store (cosine similarity on unit vectors)."""
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+
+def to_ingest_store(vectorstore: FAISS) -> FAISS:
+    """
+    Swap a store's index for an exact flat index that ingestion can edit.
+    
+    HNSW graphs can't drop nodes, so replacing a chunk in one would mean
+    rebuilding the graph. A flat index removes rows with a memmove instead
+    (FAISS.delete), and the graph is built once, in save_vectorstore.
+    
+    The flat index is filled from the float32 vectors saved next to the
+    index. Stores saved without them fall back to decoding the int8 codes
+    (approximate; exact again after the next save).
+    """
+    rows = len(vectorstore.index_to_docstore_id)
+    vectors = np.load(VECTORS_PATH) if os.path.exists(VECTORS_PATH) else None
+    if vectors is None or len(vectors) != rows:
+        print("   Saved float32 vectors missing or out of date; decoding them from the index")
+        vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    vectorstore.index = index
+    return vectorstore
+
+
+def save_vectorstore(vectorstore: FAISS):
+    """Build the HNSW search index from an ingest store and write it to disk."""
+    # Exact float32 copies: the ingest store is a flat index
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    
+    # Learn the int8 ranges from the whole collection, not whichever
+    # chunks came first, so no dimension is clipped or zero-width
+    training_vectors = vectors
+    if len(vectors) > SQ_TRAIN_SAMPLE:
+        rows = np.random.default_rng(0).choice(len(vectors), SQ_TRAIN_SAMPLE, replace=False)
+        training_vectors = vectors[rows]
+    
+    index = new_index(training_vectors)
+    index.add(vectors)
+    
+    os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
+    np.save(VECTORS_PATH, vectors)
+    FAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=index,
+        docstore=vectorstore.docstore,
+        index_to_docstore_id=vectorstore.index_to_docstore_id,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    ).save_local(FAISS_INDEX_DIR, index_name=FAISS_INDEX_NAME)
+
+
+def read_vectorstore(embeddings, mmap: bool = False) -> FAISS:
+    """
+    Read the saved vector store from disk (uncached).
+    
+    With mmap, the index file is memory-mapped read-only instead of copied
+    into RAM: pages load lazily on first touch, and processes on the same
+    host share one copy through the OS page cache. Such a store can be
+    searched but not modified.
+    """
+    if not mmap:
+        # The .pkl holds the docstore we wrote ourselves, so unpickling is trusted
+        return FAISS.load_local(
+            FAISS_INDEX_DIR,
+            embeddings,
+            index_name=FAISS_INDEX_NAME,
+            allow_dangerous_deserialization=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+    
+    # Same files as FAISS.load_local, but the index is opened with mmap flags
+    index = faiss.read_index(
+        os.path.join(FAISS_INDEX_DIR, f"{FAISS_INDEX_NAME}.faiss"),
+        FAISS_MMAP_FLAGS | faiss.IO_FLAG_READ_ONLY
+    )
+    with open(os.path.join(FAISS_INDEX_DIR, f"{FAISS_INDEX_NAME}.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+
+def ids_by_source(vectorstore: FAISS) -> dict:
+    """Map each source_url in the store to the IDs of its stored chunks."""
+    ids = defaultdict(set)
+    for doc_id, doc in vectorstore.docstore._dict.items():
+        source_url = doc.metadata.get("source_url")
+        if source_url is not None:
+            ids[source_url].add(doc_id)
+    return ids
+
+
+def add_embedded_documents(vectorstore: FAISS, documents: List, vectors: np.ndarray):
+    """
+    Store documents with precomputed vectors, skipping the store's own embed step.
+    
+    `vectorstore` must be an ingest store (see to_ingest_store).
+    
+    Chunks are written under deterministic IDs; any already in the store
+    are replaced, so re-running ingestion updates instead of duplicating.
+    
+    Args:
+        vectorstore: FAISS vector store to write into
+        documents: Document chunks
+        vectors: One embedding per document (from embed_texts)
+    """
+    ids = [chunk_id(doc) for doc in documents]
+    
+    existing = [i for i in ids if i in vectorstore.docstore._dict]
+    if existing:
+        vectorstore.delete(existing)
+    
+    vectorstore.add_embeddings(
+        text_embeddings=zip([doc.page_content for doc in documents], vectors),
+        metadatas=[doc.metadata for doc in documents],
+        ids=ids
+    )
+
+
+def create_vectorstore(documents: Iterable, show_progress: bool = True,
+                       batch_size: int = INGEST_BATCH_SIZE) -> FAISS:
     """
     Create a new vector store from documents.
     
     This process:
-    1. Takes each document chunk
-    2. Converts it to a 768-dimensional vector using Ollama
-    3. Stores the vector + original text in ChromaDB
+    1. Takes document chunks in batches of `batch_size`, skipping junk pages
+    2. Converts each batch to 384-dimensional vectors with MiniLM
+    3. Stores the vectors + original text in an exact (flat) FAISS index
+    4. Builds the HNSW search index from all vectors once and saves it to disk
+    
+    `documents` may be a generator (e.g. doc_loader.iter_chunks()), so
+    only one batch of chunks is held in memory at a time. If a store
+    already exists on disk, its chunks are updated in place: a page's old
+    chunks are all removed when the page comes round again, so a page that
+    now splits into fewer chunks (or gets filtered out) leaves none behind.
     
     Args:
-        documents: List of document chunks from doc_loader
+        documents: Document chunks from doc_loader (list or iterator)
         show_progress: Whether to show progress messages
+        batch_size: Number of chunks embedded and stored per step
     
     Returns:
-        Chroma vector store with embedded documents
+        FAISS vector store with embedded documents
     """
     if show_progress:
-        print("\n" + "="*60)
         print("\n" + "="*60)
         print("Creating Vector Store")
         print("="*60)
-        print(f"   Documents to embed: {len(documents)}")
-        print(f"   Storage location: {VECTORSTORE_DIR}")
-        print(f"   Collection name: {COLLECTION_NAME}")
+        if hasattr(documents, "__len__"):
+            print(f"   Documents to embed: {len(documents)}")
+        print(f"   Storage location: {FAISS_INDEX_DIR}")
+        print(f"   Index name: {FAISS_INDEX_NAME}")
         print("\n   This may take a few minutes...")
     
     # Get embeddings model
     embeddings = get_embeddings()
     
-    # Create ChromaDB vector store
-    # persist_directory saves to disk so we don't have to re-embed every time!
-    vectorstore = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=VECTORSTORE_DIR,
-        collection_name=COLLECTION_NAME
-    )
+    # Start from the saved store when there is one (idempotent re-runs);
+    # otherwise the index is created once the vector size is known
+    vectorstore = to_ingest_store(read_vectorstore(embeddings)) if vectorstore_exists() else None
+    stale_ids = ids_by_source(vectorstore) if vectorstore is not None else {}
+    
+    def store_batch(batch):
+        nonlocal vectorstore
+        vectors = embed_texts([doc.page_content for doc in batch], embeddings, show_progress=False)
+        if vectorstore is None:
+            vectorstore = new_vectorstore(embeddings, faiss.IndexFlatIP(vectors.shape[1]))
+        add_embedded_documents(vectorstore, batch, vectors)
+    
+    total = 0
+    batch = []
+    for doc in documents:
+        # First chunk of a page seen this run: drop everything stored for it
+        stale = stale_ids.pop(doc.metadata.get("source_url"), None)
+        if stale:
+            vectorstore.delete(list(stale))
+        
+        doc = prepare_chunk(doc)
+        if doc is None:
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            store_batch(batch)
+            total += len(batch)
+            batch = []
+            if show_progress:
+                print(f"   Stored {total} vectors so far...")
+    if batch:
+        store_batch(batch)
+        total += len(batch)
+    
+    if vectorstore is None or vectorstore.index.ntotal == 0:
+        print("   No documents to store!")
+        return None
+    
+    # Save to disk so we don't have to re-embed every time!
+    save_vectorstore(vectorstore)
     
     if show_progress:
         print(f"\n   Vector store created successfully!")
-        print(f"   Total vectors stored: {len(documents)}")
+        print(f"   Total vectors stored: {total}")
     
     return vectorstore
 
 
-def load_vectorstore() -> Optional[Chroma]:
+def load_vectorstore() -> Optional[FAISS]:
     """
     Load an existing vector store from disk.
     
     Use this to avoid re-embedding documents every time!
+    The store is opened once per process and reused on later calls
+    (thread-safe, so concurrent sessions never open it twice).
     
     Returns:
-        Chroma vector store if exists, None otherwise
+        FAISS vector store if exists, None otherwise
     """
-    if not os.path.exists(VECTORSTORE_DIR):
-        print("Vector store not found. Run create_vectorstore first!")
-        return None
-    
-    print(f"Loading vector store from: {VECTORSTORE_DIR}")
+    global _vectorstore
+    if _vectorstore is not None:
+        return _vectorstore
     
-    embeddings = get_embeddings()
-    vectorstore = Chroma(
-        persist_directory=VECTORSTORE_DIR,
-        embedding_function=embeddings,
-        collection_name=COLLECTION_NAME
-    )
-    
-    # Get the count of documents in the store
-    count = vectorstore._collection.count()
-    print(f"   Loaded {count} vectors from existing store")
-    
-    return vectorstore
+    with _vectorstore_lock:
+        # Another thread may have loaded it while we waited
+        if _vectorstore is not None:
+            return _vectorstore
+        
+        if not vectorstore_exists():
+            print("Vector store not found. Run create_vectorstore first!")
+            return None
+        
+        print(f"Loading vector store from: {FAISS_INDEX_DIR}")
+        
+        # Query-only, so it can be memory-mapped instead of read into RAM
+        vectorstore = read_vectorstore(get_embeddings(), mmap=True)
+        set_ef_search(vectorstore, HNSW_EF_SEARCH)
+        
+        # Get the count of documents in the store
+        count = vectorstore.index.ntotal
+        print(f"   Loaded {count} vectors from existing store")
+        
+        _vectorstore = vectorstore
+        return vectorstore
 
 
 def similarity_search(query: str, k: int = 4) -> List:
     """
     Search for documents similar to the query.
     
+    Uses the process-wide store from load_vectorstore, so each call is
+    just one query embedding plus the ANN search.
+    
     This is how RAG works:
     1. Convert query to vector (using same embedding model)
     2. Find k most similar vectors in the database
@@ -164,23 +659,21 @@ if __name__ == "__main__":
     print("#"*60)
     
     # Check if vector store already exists
-    if os.path.exists(VECTORSTORE_DIR) and os.listdir(VECTORSTORE_DIR):
+    if vectorstore_exists():
         print("\nExisting vector store found!")
         choice = input("   Do you want to (L)oad existing or (R)ecreate? [L/R]: ").strip().upper()
         
         if choice == "L":
             vectorstore = load_vectorstore()
         else:
-            # Import doc_loader to get fresh documents
-            from doc_loader import load_all_documentation
-            docs, chunks = load_all_documentation()
-            vectorstore = create_vectorstore(chunks)
+            # Import doc_loader to stream fresh documents
+            from .doc_loader import iter_chunks
+            vectorstore = create_vectorstore(iter_chunks())
     else:
         print("\nNo existing vector store. Creating new one...")
-        # Import doc_loader to get documents
-        from doc_loader import load_all_documentation
-        docs, chunks = load_all_documentation()
-        vectorstore = create_vectorstore(chunks)
+        # Import doc_loader to stream documents
+        from .doc_loader import iter_chunks
+        vectorstore = create_vectorstore(iter_chunks())
     
     # Test a search
     if vectorstore:
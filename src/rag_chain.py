@@ -13,24 +13,50 @@ Why RAG?
 - LLMs don't know about specific documentation
 - RAG gives the LLM "context" to answer accurately
 - Reduces hallucination (making things up)
+
+Try it from the project root with: python -m src.rag_chain
 """
 
+import asyncio
+import atexit
+import io
+import itertools
+import json
+import logging
 import os
-import sys
-
-# Add parent directory to path so we can import from src
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+from collections import OrderedDict
 
+import faiss
+import httpx
+import numpy as np
+from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda
 from langchain_core.messages import HumanMessage, AIMessage
-from src.embeddings import load_vectorstore
+from .embeddings import embed_texts, get_embeddings, load_vectorstore, vectorstore_version
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Groq settings, read once per process
+# Use model from environment variable, default to llama-3.1-8b-instant if not set
+_MODEL_NAME = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+_API_KEY = os.getenv("GROQ_API_KEY")
 
+if _API_KEY:
+    logger.info("Using Groq model: %s", _MODEL_NAME)
+else:
+    logger.error("GROQ_API_KEY not found in .env file!")
 
-# The prompt template - this is CRITICAL for good answers!
-RAG_PROMPT_TEMPLATE = """You are an expert assistant specialized in LangChain, LangGraph, and LangSmith frameworks.
+
+# The prompt - this is CRITICAL for good answers!
+# Static instructions go in the system message: identical on every call, so
+# providers with prefix caching can reuse it instead of re-processing it.
+RAG_SYSTEM_PROMPT = """You are an expert assistant specialized in LangChain, LangGraph, and LangSmith frameworks.
 
 Your job is to help developers understand and use these frameworks effectively.
 
@@ -41,7 +67,16 @@ INSTRUCTIONS:
 4. Include code examples when relevant
 5. Mention which framework (LangChain, LangGraph, or LangSmith) the answer relates to
 
-CONTEXT FROM DOCUMENTATION:
+    Provide a comprehensive, beginner-friendly explanation.
+    - Break down complex concepts into simple terms.
+    - Uses analogies if helpful.
+    - Provide a detailed answer that teaches    - The user wants a detailed, comprehensive answer.
+    - If the "Context" is just a code snippet (like a specific function), you MUST first define the general concept using your own knowledge, then explain how the code relates to it.
+    - If the answer is completely missing from the context, say "I don't have information about that in my specific documentation." and STOP. Do not try to answer from general knowledge.
+    - Do NOT hallucinate specific library features that don't exist."""
+
+# Per-question part of the prompt
+RAG_USER_TEMPLATE = """CONTEXT FROM DOCUMENTATION:
 {context}
 
 
@@ -49,69 +84,212 @@ CHAT HISTORY (Use this for context if the user says "continue", "explain more",
 {chat_history}
 
 LATEST USER QUESTION (Focus your answer here):
-{question}
+{question}"""
 
-    Provide a comprehensive, beginner-friendly explanation.
-    - Break down complex concepts into simple terms.
-    - Uses analogies if helpful.
-    - Provide a detailed answer that teaches    - The user wants a detailed, comprehensive answer.
-    - If the "Context" is just a code snippet (like a specific function), you MUST first define the general concept using your own knowledge, then explain how the code relates to it.
-    - If the answer is completely missing from the context, say "I don't have information about that in my specific documentation." and STOP. Do not try to answer from general knowledge.
-    - Do NOT hallucinate specific library features that don't exist."""
+
+# Groq HTTP connection pool (kept-alive connections skip the TLS handshake)
+LLM_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+# Parsed once at import; both are stateless and shared by every chain
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", RAG_SYSTEM_PROMPT),
+    ("human", RAG_USER_TEMPLATE),
+])
+_OUTPUT_PARSER = StrOutputParser()
+
+# Chain built from the on-disk vector store, shared by every caller in the process
+_default_chain = None
+_default_chain_lock = threading.Lock()
+
+# Answers to earlier questions: exact repeats first, then same-meaning questions
+EXACT_CACHE_SIZE = 1024
+SEMANTIC_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".semantic_cache")
+SEMANTIC_CACHE_THRESHOLD = 0.95  # Cosine similarity; lower = more hits, more wrong answers
+SEMANTIC_CACHE_MAX_ENTRIES = 10000  # Oldest answers are dropped beyond this
+SEMANTIC_CACHE_SAVE_EVERY = 20  # New answers between writes to disk (also written at exit)
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+class SemanticCache:
+    """
+    Stores (question, answer) pairs keyed by the question's embedding.
+    
+    Questions are embedded with the same model as the vector store and
+    searched in a FAISS inner-product index; with unit-length vectors the
+    score is the cosine similarity. Holds at most max_entries answers
+    (oldest dropped first) and is written to disk every save_every new
+    answers. Answers belong to the vector store they were generated from,
+    so a saved cache is discarded once the store has been rebuilt.
+    """
+    
+    def __init__(self, cache_dir: str = SEMANTIC_CACHE_DIR, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, save_every: int = SEMANTIC_CACHE_SAVE_EVERY):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "cache.npz")
+        self.store_version = vectorstore_version() or ""
+        self.index = None
+        self.entries = []  # [question, answer] per index row
+        self._unsaved = 0
+        self._lock = threading.Lock()  # Index and entries
+        self._save_lock = threading.Lock()  # Disk writes (never held by lookups)
+        
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                if str(data["store_version"]) == self.store_version:
+                    vectors = data["vectors"]
+                    self.entries = json.loads(str(data["entries"]))
+                    self.index = faiss.IndexFlatIP(vectors.shape[1])
+                    self.index.add(vectors)
+                else:
+                    logger.info("Vector store was rebuilt; starting with an empty semantic cache")
+    
+    def embed(self, question: str) -> np.ndarray:
+        """Embed a question as a (1, dim) unit-length float32 array."""
+        vector = np.asarray([get_embeddings().embed_query(question)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+    
+    def lookup(self, vector: np.ndarray):
+        """Return the cached answer closest to `vector`, or None below the threshold."""
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return None
+            scores, ids = self.index.search(vector, 1)
+            
+            if ids[0][0] != -1 and scores[0][0] >= self.threshold:
+                return self.entries[ids[0][0]][1]
+        return None
+    
+    def add(self, vector: np.ndarray, question: str, answer: str):
+        """Cache an answer (persisted with the next batch of new answers)."""
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vector.shape[1])
+            
+            if self.index.ntotal >= self.max_entries:
+                # Drop the oldest tenth at once rather than shifting the index on every add
+                drop = max(1, self.max_entries // 10)
+                self.index.remove_ids(np.arange(drop, dtype=np.int64))
+                del self.entries[:drop]
+            
+            self.index.add(vector)
+            self.entries.append([question, answer])
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """Write any unsaved answers to disk."""
+        with self._save_lock:
+            # Copy under the lock, write without it: lookups never wait on the disk
+            with self._lock:
+                if not self._unsaved:
+                    return
+                vectors = self.index.reconstruct_n(0, self.index.ntotal)
+                entries = json.dumps(self.entries)
+                self._unsaved = 0
+            
+            os.makedirs(self.cache_dir, exist_ok=True)
+            
+            # One file, written then renamed: a crash never leaves vectors
+            # and answers out of step (or half a file)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, vectors=vectors, entries=np.array(entries),
+                         store_version=np.array(self.store_version))
+            os.replace(tmp_path, self.path)
+
+
+class ExactCache:
+    """
+    LRU of answers keyed by the exact question text.
+    
+    Checked before the semantic cache: a repeated question (greetings,
+    suggested questions) is a dict lookup, with no embedding computed.
+    """
+    
+    def __init__(self, maxsize: int = EXACT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, question: str):
+        """Return the cached answer for `question`, or None."""
+        key = question.strip()
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self._answers.move_to_end(key)
+            return answer
+    
+    def put(self, question: str, answer: str):
+        """Cache an answer, evicting the least recently used one when full."""
+        key = question.strip()
+        with self._lock:
+            self._answers[key] = answer
+            self._answers.move_to_end(key)
+            if len(self._answers) > self.maxsize:
+                self._answers.popitem(last=False)
+
+
+_exact_cache = ExactCache()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Get the process-wide semantic cache (loaded from disk on first use)."""
+    global _semantic_cache
+    if _semantic_cache is not None:
+        return _semantic_cache
+    
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            cache = SemanticCache()
+            atexit.register(cache.flush)  # Keep answers added since the last write
+            _semantic_cache = cache
+        return _semantic_cache
 
 
 def format_docs(docs):
     """
     Format retrieved documents into a single string for the prompt.
     
+    Junk pages are filtered out and the text is cleaned at ingestion
+    (embeddings.prepare_chunk), so each document is written straight
+    into one buffer in a single pass.
+    
     Args:
         docs: List of retrieved documents
     
     Returns:
         Formatted string with document contents and sources
     """
-    formatted = []
+    out = io.StringIO()
     for i, doc in enumerate(docs, 1):
-        source = doc.metadata.get('source_framework', 'unknown')
-        url = doc.metadata.get('source_url', '')
-        content = doc.page_content
-        
-        # Skip redirect pages and pages with very little content
-        if 'Redirecting' in content:
-            continue
-        if len(content.strip()) < 100:  # Skip very short content
-            continue
-        if 'Skip to main content' in content and len(content) < 200:
-            continue
-            
-        # Clean up the content - remove navigation noise
-        lines = content.split('\n')
-        clean_lines = []
-        for line in lines:
-            line = line.strip()
-            # Skip navigation-like lines
-            if line in ['', 'Docs', 'Search', 'Home', 'API Reference', 'Tutorials']:
-                continue
-            clean_lines.append(line)
-        
-        clean_content = ' '.join(clean_lines)
-        
-        if len(clean_content) > 50:  # Only add if there's meaningful content
-            formatted.append(f"[Document {len(formatted)+1} - {source.upper()}]\n{clean_content}\n")
-        
-        # Limit to 5 good documents to avoid too much context
-        if len(formatted) >= 5:
-            break
+        if i > 1:
+            out.write("\n---\n")
+        out.write(f"[Document {i} - {doc.metadata.get('source_framework', 'unknown').upper()}]\n")
+        out.write(doc.metadata.get('clean_content', doc.page_content))
+        out.write("\n")
     
-    return "\n---\n".join(formatted) if formatted else "No relevant documentation found in the knowledge base."
+    return out.getvalue() or "No relevant documentation found in the knowledge base."
 
 
-def format_chat_history(history):
+def format_chat_history(history, max_turns: int = 5):
     """
     Format chat history for the prompt.
     
+    Only the last `max_turns` turns are kept, so the prompt (and Groq's
+    prefill cost) stops growing with the length of the conversation.
+    
     Args:
-        history: List of (user_message, ai_message) tuples
+        history: Sequence of (user_message, ai_message) tuples (list or deque)
+        max_turns: Maximum number of recent turns to include
     
     Returns:
         Formatted string of chat history
@@ -119,12 +297,9 @@ def format_chat_history(history):
     if not history:
         return "No previous conversation."
     
-    formatted = []
-    for human, ai in history:
-        formatted.append(f"User: {human}")
-        formatted.append(f"Assistant: {ai}")
-    
-    return "\n".join(formatted)
+    # islice rather than history[-max_turns:] so deques work too
+    recent = itertools.islice(history, max(len(history) - max_turns, 0), None)
+    return "\n".join(f"User: {human}\nAssistant: {ai}" for human, ai in recent)
 
 
 def create_rag_chain(vectorstore=None):
@@ -134,74 +309,92 @@ def create_rag_chain(vectorstore=None):
     This is the core pipeline:
     Question → Retrieve docs → Format prompt → Generate answer
     
+    The chain for the on-disk vector store is built once per process and
+    reused, so repeated calls skip the index load and LLM client setup
+    (thread-safe, so concurrent first calls never build it twice).
+    
     Args:
         vectorstore: Optional vectorstore, will load from disk if not provided
     
     Returns:
-        Configured RAG chain ready for queries
+        Tuple of (rag_chain, retriever)
     """
+    if vectorstore is None:
+        global _default_chain
+        if _default_chain is not None:
+            return _default_chain
+        
+        with _default_chain_lock:
+            # Another thread may have built it while we waited
+            if _default_chain is None:
+                _default_chain = _build_rag_chain()
+            return _default_chain
+    
+    return _build_rag_chain(vectorstore)
+
+
+def _build_rag_chain(vectorstore=None):
+    """Build a new (rag_chain, retriever) pair; see create_rag_chain."""
+    # Fail before the (slow) index load rather than on the first question
+    if not _API_KEY:
+        raise ValueError("GROQ_API_KEY not found in .env file!")
+    
     # Load vector store if not provided
     if vectorstore is None:
         vectorstore = load_vectorstore()
         if vectorstore is None:
             raise ValueError("No vector store found. Run embeddings.py first!")
     
-    # Create retriever - fetches top 10 most relevant documents
-    # We get more than we need, then filter out bad ones
+    # Create retriever - fetches the 5 most relevant documents
+    # (bad pages never make it into the index, so no over-fetching needed)
     retriever = vectorstore.as_retriever(
         search_type="similarity",
-        search_kwargs={"k": 10}
+        search_kwargs={"k": 5}
     )
     
-    # Create prompt template
-    prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
-    
     # Create LLM connection to Groq
-    # Use model from environment variable, default to llama3-8b-8192 if not set
-    model_name = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
-    api_key = os.getenv("GROQ_API_KEY")
-    
-    if not api_key:
-        print("ERROR: GROQ_API_KEY not found in .env file!")
-        # Fallback to direct input if env not set (for testing)
-        # api_key = "gsk_..."
-    
-    print(f"Loading Groq model: {model_name}")
-    
     llm = ChatGroq(
-        model=model_name,
+        model=_MODEL_NAME,
         temperature=0,  # Reduced temperature for more factual answers
-        api_key=api_key
+        api_key=_API_KEY,
+        http_client=httpx.Client(limits=LLM_HTTP_LIMITS),
+        http_async_client=httpx.AsyncClient(limits=LLM_HTTP_LIMITS)
     )
     
     # Helper function to get context from retriever
     def get_context(input_dict):
-        """Retrieve relevant documents based on the question."""
+        """Retrieve relevant documents based on the question (unless already retrieved)."""
         question = input_dict["question"]
-        docs = retriever.invoke(question)
+        docs = input_dict.get("docs")
+        if docs is None:
+            docs = retriever.invoke(question)
         
-        # Debug output
-        print(f"\n[DEBUG] Retrieved {len(docs)} documents for query: '{question}'")
-        for i, doc in enumerate(docs[:3]):  # Show first 3
-            content_preview = doc.page_content[:100].replace('\n', ' ')
-            print(f"  Doc {i+1}: {content_preview}...")
+        # Lazy %-args: nothing is formatted unless DEBUG logging is on
+        logger.debug("Retrieved %d documents for query: %r", len(docs), question)
+        if logger.isEnabledFor(logging.DEBUG):
+            # Previews are only sliced when someone is reading them
+            for i, doc in enumerate(itertools.islice(docs, 3), 1):
+                logger.debug("  Doc %d: %s...", i, doc.page_content[:100].replace('\n', ' '))
         
         context = format_docs(docs)
-        print(f"[DEBUG] Formatted context length: {len(context)} chars")
-        print(f"[DEBUG] Context preview: {context[:200]}...")
+        logger.debug("Formatted context length: %d chars", len(context))
         
         return context
     
-    # Build the chain using proper input handling
-    rag_chain = (
-        {
-            "context": lambda x: get_context(x),
-            "chat_history": lambda x: format_chat_history(x.get("chat_history", [])),
-            "question": lambda x: x["question"]
+    def prepare_inputs(input_dict):
+        """Build all prompt variables in one step."""
+        return {
+            "context": get_context(input_dict),
+            "chat_history": format_chat_history(input_dict.get("chat_history", [])),
+            "question": input_dict["question"]
         }
-        | prompt
+    
+    # Build the chain: one input step (not three parallel lambdas), then prompt → LLM
+    rag_chain = (
+        RunnableLambda(prepare_inputs)
+        | _PROMPT
         | llm
-        | StrOutputParser()
+        | _OUTPUT_PARSER
     )
     
     return rag_chain, retriever
@@ -211,6 +404,11 @@ def ask_question(question: str, chat_history: list = None):
     """
     Ask a question to the RAG chatbot.
     
+    Questions without chat history are answered from cache when the same
+    question (exact text, then semantic match) was answered before, with
+    no LLM call. Follow-ups depend on the conversation, so they always go
+    to the LLM.
+    
     Args:
         question: The user's question
         chat_history: List of (user_message, ai_message) tuples
@@ -222,18 +420,190 @@ def ask_question(question: str, chat_history: list = None):
     
     print(f"\nProcessing: '{question[:50]}...'")
     
-    # Create the chain
+    cache = get_semantic_cache() if not chat_history else None
+    if cache is not None:
+        cached = _exact_cache.get(question)
+        if cached is not None:
+            return cached
+        
+        vector = cache.embed(question)
+        cached = cache.lookup(vector)
+        if cached is not None:
+            _exact_cache.put(question, cached)
+            return cached
+    
+    # Shared chain, built on the first question only
     rag_chain, retriever = create_rag_chain()
     
+    inputs = {"question": question, "chat_history": chat_history}
+    if cache is not None:
+        # The cache lookup already embedded the question: retrieve with that vector
+        inputs["docs"] = retrieve_by_vectors(retriever, vector)[0]
+    
     # Get the answer
-    response = rag_chain.invoke({
-        "question": question,
-        "chat_history": chat_history
-    })
+    response = rag_chain.invoke(inputs)
+    
+    if cache is not None:
+        _exact_cache.put(question, response)
+        cache.add(vector, question, response)
     
     return response
 
 
+def ask_question_stream(question: str, chat_history: list = None):
+    """
+    Ask a question and yield the answer piece by piece as the LLM writes it.
+    
+    Same caching as ask_question; a cached answer is yielded in one piece.
+    
+    Args:
+        question: The user's question
+        chat_history: List of (user_message, ai_message) tuples
+    
+    Yields:
+        Chunks of the AI's response
+    """
+    chat_history = chat_history or []
+    
+    cache = get_semantic_cache() if not chat_history else None
+    if cache is not None:
+        cached = _exact_cache.get(question)
+        if cached is None:
+            vector = cache.embed(question)
+            cached = cache.lookup(vector)
+        if cached is not None:
+            _exact_cache.put(question, cached)
+            yield cached
+            return
+    
+    rag_chain, retriever = create_rag_chain()
+    
+    inputs = {"question": question, "chat_history": chat_history}
+    if cache is not None:
+        inputs["docs"] = retrieve_by_vectors(retriever, vector)[0]  # No second embed
+    
+    chunks = []
+    stream = rag_chain.stream(inputs)
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        stream.close()  # Closing this generator early also ends the LLM stream
+    
+    # Only complete answers reach the cache
+    if cache is not None:
+        response = "".join(chunks)
+        _exact_cache.put(question, response)
+        cache.add(vector, question, response)
+
+
+async def aask_question(question: str, chat_history: list = None):
+    """
+    Async version of ask_question.
+    
+    The LLM call is awaited (rag_chain.ainvoke) instead of holding a thread,
+    so one event loop can serve many questions at once. Embedding, cache
+    and first-time chain setup are CPU/disk work and run in a worker thread.
+    
+    Args:
+        question: The user's question
+        chat_history: List of (user_message, ai_message) tuples
+    
+    Returns:
+        The AI's response
+    """
+    chat_history = chat_history or []
+    
+    cache = get_semantic_cache() if not chat_history else None
+    if cache is not None:
+        cached = _exact_cache.get(question)
+        if cached is not None:
+            return cached
+        
+        vector = await asyncio.to_thread(cache.embed, question)
+        cached = cache.lookup(vector)
+        if cached is not None:
+            _exact_cache.put(question, cached)
+            return cached
+    
+    rag_chain, retriever = await asyncio.to_thread(create_rag_chain)
+    
+    inputs = {"question": question, "chat_history": chat_history}
+    if cache is not None:
+        docs = await asyncio.to_thread(retrieve_by_vectors, retriever, vector)
+        inputs["docs"] = docs[0]  # No second embed
+    
+    response = await rag_chain.ainvoke(inputs)
+    
+    if cache is not None:
+        _exact_cache.put(question, response)
+        await asyncio.to_thread(cache.add, vector, question, response)
+    
+    return response
+
+
+def retrieve_batch(retriever, questions: list):
+    """
+    Retrieve documents for many questions with one embed call and one index search.
+    
+    Same results as calling retriever.invoke per question, but the questions
+    are embedded as one batch and FAISS searches them as a single matrix.
+    
+    Returns:
+        One list of documents per question
+    """
+    vectors = embed_texts(questions, retriever.vectorstore.embeddings, show_progress=False)
+    return retrieve_by_vectors(retriever, vectors)
+
+
+def retrieve_by_vectors(retriever, vectors: np.ndarray):
+    """
+    Retrieve documents for already-embedded questions (unit-length rows).
+    
+    Lets a vector computed for the semantic cache be reused for retrieval,
+    so an uncached question is embedded once, not twice.
+    
+    Returns:
+        One list of documents per row of `vectors`
+    """
+    vectorstore = retriever.vectorstore
+    k = retriever.search_kwargs.get("k", 4)
+    
+    _, ids = vectorstore.index.search(vectors, k)
+    
+    return [
+        [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in row if i != -1]
+        for row in ids
+    ]
+
+
+def ask_questions_batch(questions: list, max_concurrency: int = 16):
+    """
+    Answer several independent questions at once.
+    
+    Retrieval runs as one batched search, and the LLM calls are sent
+    concurrently (up to max_concurrency in flight) instead of one by one.
+    
+    Args:
+        questions: The questions to answer (no chat history)
+        max_concurrency: Maximum number of simultaneous LLM requests
+    
+    Returns:
+        List of answers, in the same order as the questions
+    """
+    if not questions:
+        return []
+    
+    rag_chain, retriever = create_rag_chain()
+    
+    inputs = [
+        {"question": question, "chat_history": [], "docs": docs}
+        for question, docs in zip(questions, retrieve_batch(retriever, questions))
+    ]
+    return rag_chain.batch(inputs, config={"max_concurrency": max_concurrency})
+
+
 # Interactive test when run directly
 if __name__ == "__main__":
     print("\n" + "#"*60)
@@ -261,13 +631,17 @@ if __name__ == "__main__":
             if not question:
                 continue
             
-            # Get answer
-            response = rag_chain.invoke({
+            # Print the answer as it is generated
+            print("\nAssistant: ", end="", flush=True)
+            chunks = []
+            for chunk in rag_chain.stream({
                 "question": question,
                 "chat_history": chat_history
-            })
-            
-            print(f"\nAssistant: {response}")
+            }):
+                print(chunk, end="", flush=True)
+                chunks.append(chunk)
+            print()
+            response = "".join(chunks)
             
             # Add to history
             chat_history.append((question, response))
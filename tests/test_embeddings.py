@@ -0,0 +1,80 @@
+"""
+Tests for vector store ingestion (src/embeddings.py).
+
+A hash-seeded fake embeddings model stands in for MiniLM, so no model is
+downloaded; the store is written to a temporary directory.
+"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src import embeddings as emb
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic 32-dim vectors derived from a hash of the text."""
+
+    encode_kwargs = {}
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(32).astype(np.float32).tolist()
+
+
+def page_chunks(url, count, version=""):
+    """`count` numbered chunks of one page, long enough to pass prepare_chunk."""
+    return [
+        Document(
+            page_content=f"{version} {url} chunk {i}: " + "LangChain documentation text. " * 10,
+            metadata={"source_url": url, "chunk_index": i, "source_framework": "langchain"}
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(emb, "FAISS_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(emb, "VECTORS_PATH", str(tmp_path / f"{emb.FAISS_INDEX_NAME}.npy"))
+    monkeypatch.setattr(emb, "get_embeddings", FakeEmbeddings)
+    return tmp_path
+
+
+def test_reingest_of_shrunk_page_drops_its_old_chunks(store_dir):
+    first = emb.create_vectorstore(
+        page_chunks("https://a", 30) + page_chunks("https://b", 5), show_progress=False
+    )
+    assert first.index.ntotal == 35
+
+    # Page a now splits into 20 chunks; page b is not re-ingested
+    second = emb.create_vectorstore(page_chunks("https://a", 20, version="v2"), show_progress=False)
+
+    assert second.index.ntotal == 25
+    assert len(second.index_to_docstore_id) == 25
+    sources = [doc.metadata["source_url"] for doc in second.docstore._dict.values()]
+    assert sources.count("https://a") == 20
+    assert sources.count("https://b") == 5
+
+
+def test_reingest_of_filtered_out_page_removes_it(store_dir):
+    emb.create_vectorstore(page_chunks("https://a", 10) + page_chunks("https://b", 5), show_progress=False)
+
+    # Page a is now a redirect stub, so none of its chunks pass prepare_chunk
+    redirect = [Document(page_content="Redirecting...", metadata={"source_url": "https://a", "chunk_index": 0})]
+    store = emb.create_vectorstore(redirect + page_chunks("https://b", 5), show_progress=False)
+
+    assert store.index.ntotal == 5